@@ -16,6 +16,10 @@ let downloadedFiles = {
 // Track downloads in progress
 let downloadsInProgress = new Map(); // downloadId -> {filename, startTime, type}
 
+// Moves and scans are queued per disk on the native host and may wait behind
+// large copies, so their responses get much longer than interactive calls
+const BACKGROUND_TIMEOUT_MS = 30 * 60 * 1000;
+
 // Native messaging port
 let nativePort = null;
 let watchedDirectories = new Set();
@@ -370,11 +374,11 @@ async function moveMatchedFiles(files) {
         id: requestId
       });
       
-      // Timeout after 10 seconds
+      // Time out only if the host never answers
       setTimeout(() => {
         nativePort.onMessage.removeListener(responseHandler);
         resolve({ success: false, error: 'Move timeout' });
-      }, 10000);
+      }, BACKGROUND_TIMEOUT_MS);
     });
   }
   
@@ -646,10 +650,54 @@ function handleNativeNotification(notification) {
       updateBadge();
       break;
       
+    case 'archive_extracted':
+      // Funscripts were streamed out of a downloaded ZIP in one batch;
+      // sizes come from the archive, so no per-file size check is needed
+      let addedFromArchive = 0;
+      (notification.files || []).forEach(file => {
+        const exists = downloadedFiles.funscripts.some(f => f.path === file.path);
+        if (!exists && file.size > 0) {
+          downloadedFiles.funscripts.push({
+            id: Date.now() + Math.random(),
+            filename: file.filename,
+            path: file.path,
+            nativeDetected: true,
+            archive: notification.archive,
+            timestamp: notification.timestamp || Date.now(),
+            fileSize: file.size
+          });
+          addedFromArchive++;
+        }
+      });
+
+      if (addedFromArchive > 0) {
+        saveToStorage();
+        if (userSettings.autoRemoveMatches) {
+          checkAndRemoveMatches();
+        }
+
+        if (userSettings.showNotifications) {
+          browser.notifications.create({
+            type: 'basic',
+            iconUrl: browser.extension.getURL('icon-48.png'),
+            title: 'Funscripts Extracted',
+            message: `Extracted ${addedFromArchive} funscript(s) from ${notification.archive.split(/[\\/]/).pop()}`
+          });
+        }
+      }
+      break;
+
     case 'file_renamed':
       // A file was renamed
       console.log(`File renamed: ${notification.old_path} -> ${notification.new_path}`);
       break;
+
+    case 'files_renamed':
+      // A group of files was renamed together by rename_many
+      notification.renames.forEach(r => {
+        console.log(`File renamed: ${r.old_path} -> ${r.new_path}`);
+      });
+      break;
   }
 }
 
@@ -746,11 +794,11 @@ function scanDirectory(directoryPath) {
         id: requestId
       });
       
-      // Timeout after 10 seconds
+      // Time out only if the host never answers
       setTimeout(() => {
         nativePort.onMessage.removeListener(responseHandler);
         resolve({ success: false, error: 'Scan timeout' });
-      }, 10000);
+      }, BACKGROUND_TIMEOUT_MS);
     });
   }
   
@@ -990,6 +1038,12 @@ browser.runtime.onMessage.addListener((request, sender, sendResponse) => {
       .then(result => sendResponse(result))
       .catch(error => sendResponse({ success: false, error: error.message }));
     return true; // Keep channel open for async response
+  } else if (request.action === 'renameFiles') {
+    // Handle a group rename as a single all-or-nothing operation
+    handleRenameMany(request.renames || [])
+      .then(result => sendResponse(result))
+      .catch(error => sendResponse({ success: false, error: error.message }));
+    return true; // Keep channel open for async response
   } else if (request.action === 'scanDirectory') {
     // Scan a directory for files
     scanDirectory(request.directory)
@@ -1193,11 +1247,11 @@ browser.runtime.onMessage.addListener((request, sender, sendResponse) => {
         id: moveId
       });
       
-      // Timeout after 10 seconds
+      // Time out only if the host never answers
       setTimeout(() => {
         nativePort.onMessage.removeListener(responseHandler);
         sendResponse({ success: false, error: 'Timeout moving file' });
-      }, 10000);
+      }, BACKGROUND_TIMEOUT_MS);
       
       return true; // Keep channel open for async response
     } else {
@@ -1334,6 +1388,113 @@ async function handleRename(fileId, type, newName, originalName) {
   }
 }
 
+// Function to rename a group of files together via rename_many
+async function handleRenameMany(renames) {
+  try {
+    // Resolve every file and its path before touching anything
+    const entries = [];
+    for (const r of renames) {
+      const list = r.type === 'video' ? downloadedFiles.videos : downloadedFiles.funscripts;
+      const file = list.find(f => f.id === r.fileId);
+      if (!file) {
+        return { success: false, error: `File not found in tracker: ${r.originalName}` };
+      }
+      
+      let fullPath = file.path || null;
+      if (!fullPath && typeof file.id === 'number') {
+        const downloads = await browser.downloads.search({ id: file.id });
+        if (downloads.length > 0) {
+          fullPath = downloads[0].filename;
+        }
+      }
+      
+      entries.push({ file, fullPath, newName: r.newName, originalName: r.originalName });
+    }
+    
+    if (!nativePort) {
+      connectNativeHost();
+    }
+    
+    if (!nativePort) {
+      // Fallback to internal rename only
+      entries.forEach(e => {
+        e.file.filename = e.newName;
+        e.file.renamed = true;
+        e.file.originalName = e.originalName;
+      });
+      
+      saveToStorage();
+      checkAndRemoveMatches();
+      
+      return { 
+        success: true, 
+        note: 'Files renamed in tracker only. Install native host for disk renaming.'
+      };
+    }
+    
+    const missing = entries.find(e => !e.fullPath);
+    if (missing) {
+      return { success: false, error: `Could not determine file path: ${missing.originalName}` };
+    }
+    
+    return new Promise((resolve) => {
+      const requestId = `rename_many_${Date.now()}`;
+      
+      const responseHandler = (message) => {
+        if (message.response_to === requestId) {
+          nativePort.onMessage.removeListener(responseHandler);
+          
+          if (message.success) {
+            // Update our internal records from the paths actually renamed
+            const newPaths = new Map(message.renamed.map(r => [r.old_path, r.new_path]));
+            entries.forEach(e => {
+              e.file.filename = e.newName;
+              e.file.renamed = true;
+              e.file.originalName = e.originalName;
+              e.file.path = newPaths.get(e.fullPath) || e.fullPath;
+            });
+            
+            saveToStorage();
+            
+            checkAndRemoveMatches().then(() => {
+              console.log('Match check completed after group rename');
+            });
+            
+            resolve({ 
+              success: true, 
+              note: 'Files successfully renamed on disk'
+            });
+          } else {
+            resolve({ 
+              success: false, 
+              error: message.error || (message.errors || []).join('\n') || 'Native host rename failed'
+            });
+          }
+        }
+      };
+      
+      nativePort.onMessage.addListener(responseHandler);
+      
+      nativePort.postMessage({
+        action: 'rename_many',
+        renames: entries.map(e => ({ oldPath: e.fullPath, newName: e.newName })),
+        id: requestId
+      });
+      
+      // Timeout after 5 seconds
+      setTimeout(() => {
+        nativePort.onMessage.removeListener(responseHandler);
+        resolve({ 
+          success: false, 
+          error: 'Native host timeout'
+        });
+      }, 5000);
+    });
+  } catch (error) {
+    return { success: false, error: error.message };
+  }
+}
+
 // Load data on startup
 loadFromStorage().then(() => {
   updateBadge();
@@ -8,15 +8,29 @@ import sys
 import json
 import struct
 import os
+import errno
+import heapq
+import itertools
 import shutil
 import logging
 import threading
 import time
 import re
+import bisect
+import tempfile
+import zipfile
+import zlib
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Dict, List, Optional
 import queue
 
+# numpy is optional; heatmaps fall back to pure Python without it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 # Set up logging
 LOG_FILE = Path.home() / '.funscript_rename_host.log'
 logging.basicConfig(
@@ -25,12 +39,195 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+# Precomputed funscript heatmaps, keyed by path and validated by size+mtime
+HEATMAP_CACHE_FILE = Path.home() / '.funscript_rename_host_heatmaps.json'
+HEATMAP_BUCKETS = 512
+HEATMAP_MAX_BUCKETS = 4096
+# Bump when the heatmap computation changes so stale cache entries are redone
+HEATMAP_VERSION = 3
+
+# Archives whose funscripts were already extracted, validated by size+mtime
+ARCHIVE_STATE_FILE = Path.home() / '.funscript_rename_host_archives.json'
+
+# Actions that run on the per-device background workers so interactive calls
+# stay responsive
+BACKGROUND_ACTIONS = {'move_files', 'move_single_file', 'scan', 'extract_archive', 'extract_archive_member'}
+
+# Concurrent I/O streams allowed per device kind
+DEVICE_IO_LIMITS = {'hdd': 1, 'network': 1, 'ssd': 4, 'unknown': 2}
+NETWORK_FILESYSTEMS = {
+    'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'fuse.sshfs', 'sshfs',
+    '9p', 'afs', 'ceph', 'glusterfs', 'fuse.glusterfs', 'davfs', 'fuse.rclone'
+}
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+class DeviceQueue:
+    """Wait queue and concurrency limit for a single st_dev."""
+    
+    def __init__(self, device, kind, sample_path):
+        self.device = device
+        self.kind = kind
+        self.limit = DEVICE_IO_LIMITS[kind]
+        self.sample_path = str(sample_path)
+        self.active = 0
+        self.waiting = []  # heap of (priority, sequence)
+        self.condition = threading.Condition()
+
+
+class IOScheduler:
+    """Per-device I/O gate that admits interactive work before background work.
+    
+    Callers wrap each disk operation (or each chunk of a long copy) in
+    slot(); slots must not be nested, since a device may only allow one.
+    """
+    
+    INTERACTIVE = 0
+    BACKGROUND = 1
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.devices = {}
+        self.sequence = itertools.count()
+    
+    def device_for(self, path):
+        """Return (st_dev, existing path) for path or its nearest existing parent."""
+        path = Path(path)
+        for candidate in (path, *path.parents):
+            try:
+                return candidate.stat().st_dev, candidate
+            except OSError:
+                continue
+        return None, path
+    
+    def classify_device(self, device):
+        """Guess whether a device is an HDD, SSD or network mount (Linux only)."""
+        try:
+            major, minor = os.major(device), os.minor(device)
+            fstype, source = None, ''
+            with open('/proc/self/mountinfo', 'r') as f:
+                for line in f:
+                    fields, _, tail = line.partition(' - ')
+                    if fields.split()[2] == f'{major}:{minor}':
+                        fstype, source = (tail.split() + [''])[:2]
+                        break
+            
+            if fstype in NETWORK_FILESYSTEMS:
+                return 'network'
+            
+            # Filesystems like btrfs use anonymous device numbers; fall back
+            # to the block device named in the mount source
+            if major != 0:
+                block = Path(f'/sys/dev/block/{major}:{minor}')
+            elif source.startswith('/dev/'):
+                block = Path('/sys/class/block') / Path(source).resolve().name
+            else:
+                return 'unknown'
+            
+            block = block.resolve()
+            for queue_dir in (block / 'queue', block.parent / 'queue'):
+                rotational = queue_dir / 'rotational'
+                if rotational.exists():
+                    return 'hdd' if rotational.read_text().strip() == '1' else 'ssd'
+        except Exception as e:
+            logging.debug(f'Could not classify device {device}: {e}')
+        
+        return 'unknown'
+    
+    def get_queue(self, path):
+        """Return the DeviceQueue for the device holding path."""
+        device, existing = self.device_for(path)
+        with self.lock:
+            device_queue = self.devices.get(device)
+        if device_queue is not None:
+            return device_queue
+        
+        # Classify outside the lock; it reads /proc and /sys
+        kind = self.classify_device(device) if device is not None else 'unknown'
+        with self.lock:
+            if device not in self.devices:
+                self.devices[device] = DeviceQueue(device, kind, existing)
+                logging.info(f'I/O device {device} ({kind}) for {existing}')
+            return self.devices[device]
+    
+    @contextmanager
+    def slot(self, path, background=False):
+        """Hold one of the device's I/O slots for the duration of the block."""
+        device_queue = self.get_queue(path)
+        ticket = (self.BACKGROUND if background else self.INTERACTIVE, next(self.sequence))
+        
+        with device_queue.condition:
+            heapq.heappush(device_queue.waiting, ticket)
+            while device_queue.active >= device_queue.limit or device_queue.waiting[0] != ticket:
+                device_queue.condition.wait()
+            heapq.heappop(device_queue.waiting)
+            device_queue.active += 1
+            device_queue.condition.notify_all()
+        
+        try:
+            yield
+        finally:
+            with device_queue.condition:
+                device_queue.active -= 1
+                device_queue.condition.notify_all()
+    
+    def status(self):
+        """Return queue depth for every device seen so far."""
+        with self.lock:
+            device_queues = list(self.devices.values())
+        
+        devices = []
+        for device_queue in device_queues:
+            with device_queue.condition:
+                waiting = [priority for priority, _ in device_queue.waiting]
+                devices.append({
+                    'device': device_queue.device,
+                    'kind': device_queue.kind,
+                    'path': device_queue.sample_path,
+                    'limit': device_queue.limit,
+                    'active': device_queue.active,
+                    'waiting_interactive': waiting.count(self.INTERACTIVE),
+                    'waiting_background': waiting.count(self.BACKGROUND)
+                })
+        return devices
+
+
 class NativeMessagingHost:
     def __init__(self):
         self.message_queue = queue.Queue()
         self.running = True
         self.watched_directories = set()
         self.file_watchers = {}
+        # Paths written by archive extraction; the watcher skips these so the
+        # extension only gets the single batched archive notification
+        self.suppressed_paths = set()
+        self.archive_lock = threading.Lock()
+        # Without a state file, archives already in watched folders predate the
+        # host (e.g. unzipped by hand) and are recorded instead of extracted
+        self.seed_archive_state = not ARCHIVE_STATE_FILE.exists()
+        self.processed_archives = self.load_json_file(ARCHIVE_STATE_FILE)
+        if self.seed_archive_state:
+            try:
+                self.write_json_file(ARCHIVE_STATE_FILE, self.processed_archives)
+            except Exception as e:
+                logging.error(f'Error saving archive state: {e}')
+        self.heatmap_lock = threading.Lock()
+        self.heatmap_queue = queue.Queue()
+        self.heatmap_cache = self.load_heatmap_cache()
+        # Set when the in-memory cache has entries not yet saved by heatmap_worker
+        self.heatmap_dirty = False
+        self.io = IOScheduler()
+        self.send_lock = threading.Lock()
+        # Long-running work runs on a pool of workers per source device,
+        # {st_dev: (queue of (function, args, ticket), [threads])}
+        self.background_workers = {}
+        self.background_lock = threading.Lock()
+        self.background_stopping = False
+        # Jobs touching the same files run in submission order:
+        # {path: [ticket, ...]} where the first ticket may run
+        self.path_tickets = {}
+        self.path_condition = threading.Condition()
+        self.job_sequence = itertools.count()
         
     def get_message(self):
         """Read a message from stdin."""
@@ -45,9 +242,66 @@ class NativeMessagingHost:
         """Send a message to the extension."""
         encoded_content = json.dumps(message_content).encode('utf-8')
         encoded_length = struct.pack('@I', len(encoded_content))
-        sys.stdout.buffer.write(encoded_length)
-        sys.stdout.buffer.write(encoded_content)
-        sys.stdout.buffer.flush()
+        # Responses and notifications are written from several threads
+        with self.send_lock:
+            sys.stdout.buffer.write(encoded_length)
+            sys.stdout.buffer.write(encoded_content)
+            sys.stdout.buffer.flush()
+    
+    def copy_stream(self, src, dst, source_path, dest_path):
+        """Copy between open files in chunks, each holding a background I/O slot."""
+        while True:
+            with self.io.slot(source_path, background=True):
+                chunk = src.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            with self.io.slot(dest_path, background=True):
+                dst.write(chunk)
+    
+    def move_path(self, source_path, dest_file):
+        """Move a file, copying cross-device moves through the I/O scheduler."""
+        try:
+            with self.io.slot(source_path, background=True):
+                os.rename(source_path, dest_file)
+            return
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+        
+        try:
+            with open(source_path, 'rb') as src, open(dest_file, 'wb') as dst:
+                self.copy_stream(src, dst, source_path, dest_file)
+            shutil.copystat(source_path, dest_file)
+        except Exception:
+            if Path(dest_file).exists():
+                Path(dest_file).unlink()
+            raise
+        
+        with self.io.slot(source_path, background=True):
+            os.unlink(source_path)
+    
+    def load_json_file(self, file_path):
+        """Load a JSON state file, returning an empty dict if missing or corrupt."""
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logging.warning(f'Discarding unreadable state file {file_path}: {e}')
+            return {}
+    
+    def write_json_file(self, file_path, data):
+        """Write a JSON state file atomically through a unique temp file."""
+        fd, tmp_name = tempfile.mkstemp(dir=file_path.parent, prefix=file_path.name, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_name, file_path)
+        except Exception:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
     
     def rename_file(self, old_path, new_name):
         """Rename a file to a new name in the same directory."""
@@ -71,7 +325,8 @@ class NativeMessagingHost:
                 }
             
             # Perform the rename
-            old_path.rename(new_path)
+            with self.io.slot(old_path):
+                old_path.rename(new_path)
             
             logging.info(f'Successfully renamed {old_path} to {new_path}')
             
@@ -96,6 +351,147 @@ class NativeMessagingHost:
                 'error': str(e)
             }
     
+    def rename_many(self, renames):
+        """Rename a group of files together, all-or-nothing.
+        
+        Renames go through temporary names in two phases so swaps and
+        rotations (A->B, B->A) work, and completed steps are rolled back
+        if any rename fails.
+        """
+        try:
+            plan = []
+            errors = []
+            listings = {}
+            
+            for item in renames:
+                old_path = Path(item.get('oldPath', ''))
+                new_name = item.get('newName')
+                
+                if not item.get('oldPath') or not new_name:
+                    errors.append(f'Missing oldPath or newName: {item}')
+                    continue
+                
+                if new_name != Path(new_name).name or new_name in ('.', '..'):
+                    errors.append(f'Invalid new name: {new_name}')
+                    continue
+                
+                # One directory listing per parent folder for the whole group
+                parent = old_path.parent
+                if parent not in listings:
+                    try:
+                        with self.io.slot(parent):
+                            listings[parent] = set(os.listdir(parent))
+                    except OSError as e:
+                        errors.append(f'Cannot list directory {parent}: {e}')
+                        listings[parent] = set()
+                        continue
+                
+                if old_path.name not in listings[parent]:
+                    errors.append(f'File not found: {old_path}')
+                    continue
+                
+                new_path = parent / new_name
+                if new_path != old_path:
+                    plan.append((old_path, new_path))
+            
+            sources = {old for old, _ in plan}
+            targets = [new for _, new in plan]
+            
+            if len(sources) != len(plan):
+                errors.append('The same file appears more than once')
+            
+            if len(set(targets)) != len(targets):
+                errors.append('Several files would get the same name')
+            
+            for old_path, new_path in plan:
+                # A target may only exist if it is itself being renamed away
+                if new_path.name in listings[new_path.parent] and new_path not in sources:
+                    errors.append(f'Target file already exists: {new_path}')
+            
+            if errors:
+                return {
+                    'success': False,
+                    'errors': errors,
+                    'renamed': []
+                }
+            
+            # Count rename cycles (swaps, rotations) for diagnostics
+            mapping = dict(plan)
+            cycles = 0
+            seen = set()
+            for start in mapping:
+                node = start
+                chain = set()
+                while node in mapping and node not in seen and node not in chain:
+                    chain.add(node)
+                    node = mapping[node]
+                if node in chain:
+                    cycles += 1
+                seen |= chain
+            
+            # Phase 1: move every source to a temporary name
+            staged = []
+            completed = []
+            try:
+                for index, (old_path, new_path) in enumerate(plan):
+                    temp_path = old_path.parent / f'.rename_many_{os.getpid()}_{index}.tmp'
+                    with self.io.slot(old_path):
+                        old_path.rename(temp_path)
+                    staged.append((old_path, temp_path, new_path))
+                
+                # Phase 2: move temporaries to their final names
+                for old_path, temp_path, new_path in staged:
+                    with self.io.slot(temp_path):
+                        if new_path.exists():
+                            raise FileExistsError(f'Target file already exists: {new_path}')
+                        temp_path.rename(new_path)
+                    completed.append((old_path, temp_path, new_path))
+                    
+            except Exception as e:
+                logging.error(f'Error in rename_many, rolling back: {e}')
+                for old_path, temp_path, new_path in reversed(completed):
+                    try:
+                        new_path.rename(temp_path)
+                    except Exception as rollback_error:
+                        logging.error(f'Rollback failed for {new_path}: {rollback_error}')
+                for old_path, temp_path, new_path in reversed(staged):
+                    try:
+                        temp_path.rename(old_path)
+                    except Exception as rollback_error:
+                        logging.error(f'Rollback failed for {temp_path}: {rollback_error}')
+                return {
+                    'success': False,
+                    'errors': [str(e)],
+                    'renamed': []
+                }
+            
+            renamed = [
+                {'old_path': str(old_path), 'new_path': str(new_path)}
+                for old_path, new_path in plan
+            ]
+            
+            logging.info(f'Successfully renamed {len(renamed)} files ({cycles} cycles)')
+            
+            if renamed:
+                self.send_notification({
+                    'type': 'files_renamed',
+                    'renames': renamed,
+                    'timestamp': time.time()
+                })
+            
+            return {
+                'success': True,
+                'renamed': renamed,
+                'cycles': cycles
+            }
+            
+        except Exception as e:
+            logging.error(f'Error in rename_many: {e}')
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
     def watch_directory(self, directory_path):
         """Start watching a directory for changes."""
         try:
@@ -132,20 +528,54 @@ class NativeMessagingHost:
     def directory_watcher(self, directory: Path):
         """Watch a directory and notify about new files."""
         logging.info(f'Started watching directory: {directory}')
-        last_files = set(directory.glob('*'))
+        with self.io.slot(directory, background=True):
+            last_files = set(directory.glob('*'))
+        pending_archives = {}
+        
+        # Pick up archives that arrived while the host was not running
+        for file_path in last_files:
+            try:
+                if (file_path.name.lower().endswith('.zip') and file_path.is_file()
+                        and not self.is_archive_processed(file_path) and zipfile.is_zipfile(file_path)):
+                    if self.seed_archive_state:
+                        self.mark_archive_processed(file_path)
+                    else:
+                        self.submit_background([file_path], self.extract_archive, (file_path,))
+            except Exception as e:
+                logging.error(f'Error processing existing archive {file_path}: {e}')
         
         while self.running and str(directory) in self.watched_directories:
             try:
                 time.sleep(2)  # Check every 2 seconds
-                current_files = set(directory.glob('*'))
+                with self.io.slot(directory, background=True):
+                    current_files = set(directory.glob('*'))
                 
                 # Check for new files
                 new_files = current_files - last_files
                 for file_path in new_files:
+                    if str(file_path) in self.suppressed_paths:
+                        self.suppressed_paths.discard(str(file_path))
+                        continue
                     if file_path.is_file():
                         filename = file_path.name.lower()
+                        if filename.endswith('.zip'):
+                            if self.is_archive_processed(file_path):
+                                pass
+                            elif zipfile.is_zipfile(file_path):
+                                pending_archives.pop(file_path, None)
+                                self.submit_background([file_path], self.extract_archive, (file_path,))
+                            else:
+                                # Archive may still be written; retry next poll
+                                # while its size keeps changing
+                                size = file_path.stat().st_size
+                                if pending_archives.get(file_path) != size:
+                                    pending_archives[file_path] = size
+                                    current_files.discard(file_path)
+                                else:
+                                    pending_archives.pop(file_path, None)
+                                    logging.warning(f'Ignoring unreadable archive: {file_path}')
                         # Check if it's a funscript or video file
-                        if '.funscript' in filename or any(
+                        elif '.funscript' in filename or any(
                             filename.endswith(ext) for ext in 
                             ['.mp4', '.avi', '.mkv', '.webm', '.mov', '.wmv', '.flv', '.m4v', '.mpg', '.mpeg']
                         ):
@@ -157,6 +587,8 @@ class NativeMessagingHost:
                                 'timestamp': time.time()
                             })
                             logging.info(f'Detected new file: {file_path}')
+                            if '.funscript' in filename:
+                                self.heatmap_queue.put(file_path)
                 
                 # Check for deleted files
                 deleted_files = last_files - current_files
@@ -241,7 +673,8 @@ class NativeMessagingHost:
                         'destination': destination
                     }
                 
-                file_size = source_path.stat().st_size
+                with self.io.slot(source_path, background=True):
+                    file_size = source_path.stat().st_size
                 if file_size == 0:
                     errors.append(f"Video file is empty (0 bytes), likely still downloading: {video['path']}")
                     logging.warning(f"Cannot move set - video empty: {video['path']}")
@@ -301,7 +734,7 @@ class NativeMessagingHost:
                             counter += 1
                     
                     # Move the file
-                    shutil.move(str(source_path), str(dest_file))
+                    self.move_path(source_path, dest_file)
                     moved_files.append({
                         'original': str(source_path),
                         'new': str(dest_file),
@@ -327,6 +760,388 @@ class NativeMessagingHost:
                 'error': str(e)
             }
     
+    def read_archive_index(self, archive_path):
+        """List funscript and video members from a ZIP central directory."""
+        funscripts = []
+        videos = []
+        video_extensions = ['.mp4', '.avi', '.mkv', '.webm', '.mov', '.wmv', '.flv', '.m4v', '.mpg', '.mpeg']
+        
+        with zipfile.ZipFile(archive_path) as archive:
+            for member in archive.infolist():
+                if member.is_dir():
+                    continue
+                
+                # Only keep the basename so members can't escape the destination
+                name = member.filename.replace('\\', '/').rsplit('/', 1)[-1]
+                if not name or name.startswith('._') or member.filename.startswith('__MACOSX/'):
+                    continue
+                
+                entry = {
+                    'member': member.filename,
+                    'filename': name,
+                    'size': member.file_size
+                }
+                if '.funscript' in name.lower():
+                    funscripts.append(entry)
+                elif any(name.lower().endswith(ext) for ext in video_extensions):
+                    videos.append(entry)
+        
+        return funscripts, videos
+    
+    def same_as_member(self, file_path, info):
+        """Check whether file_path already holds this archive member's content."""
+        if not file_path.is_file() or file_path.stat().st_size != info.file_size:
+            return False
+        
+        crc = 0
+        with open(file_path, 'rb') as f:
+            while True:
+                with self.io.slot(file_path, background=True):
+                    chunk = f.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                crc = zlib.crc32(chunk, crc)
+        return crc == info.CRC
+    
+    def extract_member(self, archive, member, filename, target_dir):
+        """Stream a single archive member into target_dir without overwriting.
+        
+        Returns (path, extracted). If target_dir already holds an identical
+        copy, that path is returned and nothing is written. Files written
+        into a watched directory are hidden from the watcher; callers are
+        responsible for notifying the extension about them.
+        """
+        info = member if isinstance(member, zipfile.ZipInfo) else archive.getinfo(member)
+        target_dir.mkdir(parents=True, exist_ok=True)
+        dest_file = target_dir / filename
+        
+        if self.same_as_member(dest_file, info):
+            return dest_file, False
+        
+        # Handle existing files by adding a number suffix
+        if dest_file.exists():
+            base = dest_file.stem
+            ext = dest_file.suffix
+            counter = 1
+            while dest_file.exists():
+                dest_file = target_dir / f"{base}_{counter}{ext}"
+                counter += 1
+        
+        suppress = str(target_dir) in self.watched_directories
+        if suppress:
+            self.suppressed_paths.add(str(dest_file))
+        try:
+            with archive.open(info) as src, open(dest_file, 'wb') as dst:
+                self.copy_stream(src, dst, archive.filename, dest_file)
+        except Exception:
+            if suppress:
+                self.suppressed_paths.discard(str(dest_file))
+            if dest_file.exists():
+                dest_file.unlink()
+            raise
+        
+        return dest_file, True
+    
+    def is_archive_processed(self, archive_path):
+        """Check whether this exact archive (path, size, mtime) was extracted before."""
+        stat = Path(archive_path).stat()
+        with self.archive_lock:
+            entry = self.processed_archives.get(str(archive_path))
+        return entry == [stat.st_size, stat.st_mtime]
+    
+    def mark_archive_processed(self, archive_path):
+        """Record an extracted archive, dropping records for archives that were deleted.
+        
+        Records are only dropped when the archive's folder is still there, so
+        archives on an unmounted drive aren't extracted again on remount.
+        """
+        try:
+            stat = Path(archive_path).stat()
+            with self.archive_lock:
+                self.processed_archives[str(archive_path)] = [stat.st_size, stat.st_mtime]
+                self.processed_archives = {
+                    path: entry for path, entry in self.processed_archives.items()
+                    if os.path.exists(path) or not os.path.isdir(os.path.dirname(path))
+                }
+                self.write_json_file(ARCHIVE_STATE_FILE, self.processed_archives)
+        except Exception as e:
+            logging.error(f'Error saving archive state: {e}')
+    
+    def extract_archive(self, archive_path, destination=None, organize_in_subfolders=False):
+        """Extract only the funscripts from a ZIP archive.
+        
+        Video members are left in the archive and reported so they can be
+        extracted on demand with extract_archive_member.
+        """
+        try:
+            archive_path = Path(archive_path)
+            if not archive_path.is_file():
+                return {
+                    'success': False,
+                    'error': f'Archive not found: {archive_path}'
+                }
+            
+            dest_path = Path(destination) if destination else archive_path.parent
+            funscripts, videos = self.read_archive_index(archive_path)
+            
+            extracted = []
+            existing = []
+            errors = []
+            with zipfile.ZipFile(archive_path) as archive:
+                for entry in funscripts:
+                    try:
+                        if organize_in_subfolders:
+                            target_dir = dest_path / self.get_base_name(entry['filename'])
+                        else:
+                            target_dir = dest_path
+                        
+                        dest_file, written = self.extract_member(archive, entry['member'], entry['filename'], target_dir)
+                        if not written:
+                            existing.append(str(dest_file))
+                            logging.info(f"Skipped {entry['member']} from {archive_path}, identical file exists: {dest_file}")
+                            continue
+                        
+                        self.heatmap_queue.put(dest_file)
+                        extracted.append({
+                            'path': str(dest_file),
+                            'filename': dest_file.name,
+                            'directory': str(dest_file.parent),
+                            'size': entry['size'],
+                            'member': entry['member']
+                        })
+                        logging.info(f"Extracted {entry['member']} from {archive_path} -> {dest_file}")
+                        
+                    except Exception as e:
+                        errors.append(f"Error extracting {entry['member']}: {str(e)}")
+                        logging.error(f"Error extracting {entry['member']} from {archive_path}: {e}")
+            
+            if not errors:
+                self.mark_archive_processed(archive_path)
+            
+            if extracted or videos:
+                self.send_notification({
+                    'type': 'archive_extracted',
+                    'archive': str(archive_path),
+                    'directory': str(archive_path.parent),
+                    'files': extracted,
+                    'videos': videos,
+                    'timestamp': time.time()
+                })
+            
+            return {
+                'success': len(errors) == 0,
+                'archive': str(archive_path),
+                'extracted': extracted,
+                'existing': existing,
+                'videos': videos,
+                'errors': errors if errors else None
+            }
+            
+        except Exception as e:
+            logging.error(f"Error extracting archive {archive_path}: {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def extract_archive_member(self, archive_path, member, destination=None):
+        """Extract a single member (e.g. a video) from a ZIP archive on demand."""
+        try:
+            archive_path = Path(archive_path)
+            dest_path = Path(destination) if destination else archive_path.parent
+            
+            with zipfile.ZipFile(archive_path) as archive:
+                info = archive.getinfo(member)
+                filename = info.filename.replace('\\', '/').rsplit('/', 1)[-1]
+                if info.is_dir() or not filename:
+                    return {
+                        'success': False,
+                        'error': f'Not a file member: {member}'
+                    }
+                dest_file, written = self.extract_member(archive, info, filename, dest_path)
+            
+            if written:
+                logging.info(f"Extracted {member} from {archive_path} -> {dest_file}")
+            else:
+                logging.info(f"{member} from {archive_path} already extracted: {dest_file}")
+            
+            # Report it like any other new download so it gets tracked
+            self.send_notification({
+                'type': 'new_file_detected',
+                'path': str(dest_file),
+                'filename': dest_file.name,
+                'directory': str(dest_file.parent),
+                'timestamp': time.time()
+            })
+            
+            return {
+                'success': True,
+                'archive': str(archive_path),
+                'path': str(dest_file),
+                'filename': dest_file.name,
+                'size': dest_file.stat().st_size
+            }
+            
+        except KeyError:
+            return {
+                'success': False,
+                'error': f'Member not found in archive: {member}'
+            }
+        except Exception as e:
+            logging.error(f"Error extracting {member} from {archive_path}: {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def load_heatmap_cache(self):
+        """Load the on-disk heatmap cache, dropping entries from older versions."""
+        cache = self.load_json_file(HEATMAP_CACHE_FILE)
+        return {
+            key: entry for key, entry in cache.items()
+            if isinstance(entry, dict) and entry.get('version') == HEATMAP_VERSION
+        }
+    
+    def save_heatmap_cache(self):
+        """Write the heatmap cache to disk if it changed.
+        
+        Only heatmap_worker calls this, so the write itself needs no lock;
+        lookups are only blocked while the cache is copied.
+        """
+        with self.heatmap_lock:
+            if not self.heatmap_dirty:
+                return
+            snapshot = dict(self.heatmap_cache)
+            self.heatmap_dirty = False
+        
+        try:
+            self.write_json_file(HEATMAP_CACHE_FILE, snapshot)
+        except Exception:
+            with self.heatmap_lock:
+                self.heatmap_dirty = True
+            raise
+    
+    def compute_heatmap(self, file_path, buckets=HEATMAP_BUCKETS, background=False):
+        """Compute a fixed-width speed strip from a funscript's actions.
+        
+        Each bucket holds the average stroke speed (position units per
+        second) over its slice of the script's duration. Strokes that cross
+        a bucket edge are split between buckets by time.
+        """
+        with self.io.slot(file_path, background=background):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                actions = json.load(f).get('actions') or []
+        
+        points = sorted((a['at'], a['pos']) for a in actions if 'at' in a and 'pos' in a)
+        if len(points) < 2 or points[-1][0] <= points[0][0]:
+            return {'duration': points[-1][0] if points else 0, 'speeds': [0.0] * buckets}
+        
+        # The strip starts at 0, or earlier if the script has negative times
+        start = min(points[0][0], 0)
+        end = points[-1][0]
+        duration = end - start
+        step = duration / buckets
+        bucket_seconds = step / 1000
+        
+        # Distance travelled per bucket is the difference of the cumulative
+        # distance curve sampled at the bucket edges
+        if np is not None:
+            at = np.array([p[0] for p in points], dtype=np.float64)
+            pos = np.array([p[1] for p in points], dtype=np.float64)
+            travelled = np.concatenate(([0.0], np.cumsum(np.abs(np.diff(pos)))))
+            # Keep the last sample of identical timestamps so times are increasing
+            keep = np.append(at[1:] != at[:-1], True)
+            edges = np.arange(buckets + 1) * step + start
+            edges[-1] = end
+            cumulative = np.interp(edges, at[keep], travelled[keep])
+            speeds = np.round(np.diff(cumulative) / bucket_seconds, 1).tolist()
+        else:
+            times = []
+            travelled = []
+            total = 0.0
+            previous = points[0][1]
+            for at, pos in points:
+                total += abs(pos - previous)
+                previous = pos
+                if times and times[-1] == at:
+                    travelled[-1] = total
+                else:
+                    times.append(at)
+                    travelled.append(total)
+            
+            cumulative = []
+            for i in range(buckets + 1):
+                edge = end if i == buckets else i * step + start
+                index = bisect.bisect_right(times, edge) - 1
+                # Hold the end values outside the actions, like np.interp
+                if index < 0:
+                    cumulative.append(travelled[0])
+                elif index >= len(times) - 1:
+                    cumulative.append(travelled[-1])
+                else:
+                    slope = (travelled[index + 1] - travelled[index]) / (times[index + 1] - times[index])
+                    cumulative.append(slope * (edge - times[index]) + travelled[index])
+            
+            speeds = [
+                round((cumulative[i + 1] - cumulative[i]) / bucket_seconds, 1)
+                for i in range(buckets)
+            ]
+        
+        return {'duration': duration, 'speeds': speeds}
+    
+    def get_heatmap(self, file_path, buckets=HEATMAP_BUCKETS, background=False):
+        """Return a cached heatmap, computing and caching it if stale."""
+        path = Path(file_path)
+        with self.io.slot(path, background=background):
+            stat = path.stat()
+        # Each bucket count is cached separately so callers don't evict each other
+        key = f'{path}|{buckets}'
+        
+        with self.heatmap_lock:
+            entry = self.heatmap_cache.get(key)
+        if (entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime
+                and entry['buckets'] == buckets and entry.get('version') == HEATMAP_VERSION):
+            return entry, False
+        
+        entry = self.compute_heatmap(path, buckets, background)
+        entry.update({
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'buckets': buckets,
+            'version': HEATMAP_VERSION
+        })
+        with self.heatmap_lock:
+            self.heatmap_cache[key] = entry
+            self.heatmap_dirty = True
+        
+        return entry, True
+    
+    def heatmap_worker(self):
+        """Thread to precompute heatmaps for newly seen funscripts.
+        
+        Also the only writer of the cache file; it saves whenever the queue
+        has drained, and once more on shutdown.
+        """
+        while self.running:
+            try:
+                file_path = self.heatmap_queue.get(timeout=1)
+            except queue.Empty:
+                try:
+                    self.save_heatmap_cache()
+                except Exception as e:
+                    logging.error(f'Error saving heatmap cache: {e}')
+                continue
+            
+            try:
+                self.get_heatmap(file_path, background=True)
+            except Exception as e:
+                logging.warning(f'Could not compute heatmap for {file_path}: {e}')
+        
+        try:
+            self.save_heatmap_cache()
+        except Exception as e:
+            logging.error(f'Error saving heatmap cache: {e}')
+    
     def select_folder(self):
         """Open a folder selection dialog."""
         try:
@@ -413,12 +1228,13 @@ class NativeMessagingHost:
                 }
             
             folders = []
-            for item in base_path.iterdir():
-                if item.is_dir():
-                    folders.append({
-                        'name': item.name,
-                        'path': str(item)
-                    })
+            with self.io.slot(base_path):
+                for item in base_path.iterdir():
+                    if item.is_dir():
+                        folders.append({
+                            'name': item.name,
+                            'path': str(item)
+                        })
             
             # Sort folders by name
             folders.sort(key=lambda x: x['name'].lower())
@@ -473,7 +1289,7 @@ class NativeMessagingHost:
                     counter += 1
             
             # Move the file
-            shutil.move(str(source_path), str(dest_file))
+            self.move_path(source_path, dest_file)
             
             logging.info(f"Moved single file: {source_path} -> {dest_file}")
             
@@ -504,10 +1320,14 @@ class NativeMessagingHost:
             files = []
             video_extensions = ['.mp4', '.avi', '.mkv', '.webm', '.mov', '.wmv', '.flv', '.m4v', '.mpg', '.mpeg']
             
-            for file_path in dir_path.iterdir():
+            with self.io.slot(dir_path, background=True):
+                entries = list(dir_path.iterdir())
+            
+            for file_path in entries:
                 if file_path.is_file():
                     filename = file_path.name.lower()
                     if '.funscript' in filename:
+                        self.heatmap_queue.put(file_path)
                         files.append({
                             'path': str(file_path),
                             'filename': file_path.name,
@@ -523,6 +1343,15 @@ class NativeMessagingHost:
                             'size': file_path.stat().st_size,
                             'modified': file_path.stat().st_mtime
                         })
+                    elif filename.endswith('.zip') and zipfile.is_zipfile(file_path):
+                        files.append({
+                            'path': str(file_path),
+                            'filename': file_path.name,
+                            'type': 'archive',
+                            'size': file_path.stat().st_size,
+                            'modified': file_path.stat().st_mtime,
+                            'processed': self.is_archive_processed(file_path)
+                        })
             
             return {
                 'success': True,
@@ -553,6 +1382,16 @@ class NativeMessagingHost:
                 
                 return self.rename_file(old_path, new_name)
                 
+            elif action == 'rename_many':
+                renames = message.get('renames')
+                if not renames:
+                    return {
+                        'success': False,
+                        'error': 'Missing renames parameter'
+                    }
+                
+                return self.rename_many(renames)
+                
             elif action == 'watch':
                 directory = message.get('directory')
                 if not directory:
@@ -606,8 +1445,9 @@ class NativeMessagingHost:
                 
                 try:
                     path = Path(file_path)
-                    if path.exists() and path.is_file():
-                        size = path.stat().st_size
+                    with self.io.slot(path):
+                        size = path.stat().st_size if path.is_file() else None
+                    if size is not None:
                         return {
                             'success': True,
                             'size': size,
@@ -628,11 +1468,102 @@ class NativeMessagingHost:
                         'path': file_path
                     }
             
+            elif action == 'list_archive':
+                archive_path = message.get('archivePath')
+                if not archive_path:
+                    return {
+                        'success': False,
+                        'error': 'Missing archivePath parameter'
+                    }
+                
+                try:
+                    funscripts, videos = self.read_archive_index(archive_path)
+                    return {
+                        'success': True,
+                        'archive': archive_path,
+                        'funscripts': funscripts,
+                        'videos': videos
+                    }
+                except Exception as e:
+                    return {
+                        'success': False,
+                        'error': str(e)
+                    }
+                
+            elif action == 'extract_archive':
+                archive_path = message.get('archivePath')
+                if not archive_path:
+                    return {
+                        'success': False,
+                        'error': 'Missing archivePath parameter'
+                    }
+                
+                return self.extract_archive(
+                    archive_path,
+                    message.get('destination'),
+                    message.get('organizeInSubfolders', False)
+                )
+                
+            elif action == 'extract_archive_member':
+                archive_path = message.get('archivePath')
+                member = message.get('member')
+                if not archive_path or not member:
+                    return {
+                        'success': False,
+                        'error': 'Missing archivePath or member parameter'
+                    }
+                
+                return self.extract_archive_member(archive_path, member, message.get('destination'))
+            
+            elif action == 'funscript_heatmap':
+                paths = message.get('paths') or ([message['path']] if message.get('path') else [])
+                if not paths:
+                    return {
+                        'success': False,
+                        'error': 'Missing path or paths parameter'
+                    }
+                
+                buckets = message.get('buckets', HEATMAP_BUCKETS)
+                if (not isinstance(buckets, int) or isinstance(buckets, bool)
+                        or not 1 <= buckets <= HEATMAP_MAX_BUCKETS):
+                    return {
+                        'success': False,
+                        'error': f'buckets must be an integer between 1 and {HEATMAP_MAX_BUCKETS}'
+                    }
+                
+                heatmaps = {}
+                errors = {}
+                for file_path in paths:
+                    try:
+                        entry, _ = self.get_heatmap(file_path, buckets)
+                        heatmaps[file_path] = {
+                            'duration': entry['duration'],
+                            'speeds': entry['speeds']
+                        }
+                    except Exception as e:
+                        errors[file_path] = str(e)
+                
+                result = {
+                    'success': len(errors) == 0,
+                    'buckets': buckets,
+                    'heatmaps': heatmaps,
+                    'errors': errors if errors else None
+                }
+                if 'id' in message:
+                    result['response_to'] = message['id']
+                return result
+            
+            elif action == 'io_status':
+                return {
+                    'success': True,
+                    'devices': self.io.status()
+                }
+            
             elif action == 'ping':
                 return {
                     'success': True,
                     'message': 'Native host is running (v2 with bidirectional support)',
-                    'capabilities': ['rename', 'watch', 'scan', 'notifications', 'move_files', 'selectFolder', 'list_folders', 'move_single_file', 'get_file_size']
+                    'capabilities': ['rename', 'rename_many', 'watch', 'scan', 'notifications', 'move_files', 'selectFolder', 'list_folders', 'move_single_file', 'get_file_size', 'list_archive', 'extract_archive', 'extract_archive_member', 'funscript_heatmap', 'io_status']
                 }
             
             elif action == 'selectFolder':
@@ -682,6 +1613,96 @@ class NativeMessagingHost:
                 'error': str(e)
             }
     
+    def handle_background_message(self, message):
+        """Handle a long-running request and send its response."""
+        response = self.handle_message(message)
+        response['response_to'] = message.get('id', 'unknown')
+        logging.debug(f'Sending background response: {response}')
+        self.send_message(response)
+    
+    def background_paths(self, message):
+        """Return the files a background request works on; the first picks its device."""
+        action = message.get('action')
+        if action == 'move_files':
+            return [f['path'] for f in message.get('files') or [] if f.get('path')]
+        if action == 'move_single_file':
+            return [(message.get('file') or {}).get('path')]
+        if action in ('extract_archive', 'extract_archive_member'):
+            return [message.get('archivePath')]
+        return [message.get('directory')]
+    
+    def submit_background(self, paths, function, args):
+        """Queue work on the worker pool for the device holding paths[0].
+        
+        Jobs sharing any path are serialized in the order they were
+        submitted, so a repeated move can't race the one before it; other
+        jobs run concurrently, limited by the IOScheduler.
+        """
+        paths = [str(p) for p in paths if p]
+        device_queue = self.io.get_queue(paths[0] if paths else '.')
+        
+        with self.background_lock:
+            if self.background_stopping:
+                logging.warning(f'Dropping background work during shutdown: {paths}')
+                return
+            
+            # Tickets are taken and queued under one lock so their order matches
+            ticket = next(self.job_sequence)
+            with self.path_condition:
+                for path in paths:
+                    self.path_tickets.setdefault(path, []).append(ticket)
+            
+            if device_queue.device not in self.background_workers:
+                work_queue = queue.Queue()
+                threads = []
+                for _ in range(device_queue.limit):
+                    thread = threading.Thread(target=self.background_worker, args=(work_queue,))
+                    thread.start()
+                    threads.append(thread)
+                self.background_workers[device_queue.device] = (work_queue, threads)
+            work_queue, _ = self.background_workers[device_queue.device]
+            work_queue.put((function, args, (ticket, paths)))
+    
+    def background_worker(self, work_queue):
+        """Thread to run queued long-running work for one device.
+        
+        A None item stops the worker once everything queued before it is done.
+        """
+        while True:
+            item = work_queue.get()
+            if item is None:
+                break
+            function, args, (ticket, paths) = item
+            
+            # Wait for earlier jobs on the same files
+            with self.path_condition:
+                while any(self.path_tickets[path][0] != ticket for path in paths):
+                    self.path_condition.wait()
+            
+            try:
+                function(*args)
+            except Exception as e:
+                logging.error(f'Error in background work: {e}')
+            finally:
+                with self.path_condition:
+                    for path in paths:
+                        self.path_tickets[path].remove(ticket)
+                        if not self.path_tickets[path]:
+                            del self.path_tickets[path]
+                    self.path_condition.notify_all()
+    
+    def stop_background_workers(self):
+        """Let every device's queued work finish, then stop its workers."""
+        with self.background_lock:
+            self.background_stopping = True
+            workers = list(self.background_workers.values())
+        for work_queue, threads in workers:
+            for _ in threads:
+                work_queue.put(None)
+        for _, threads in workers:
+            for thread in threads:
+                thread.join()
+    
     def notification_sender(self):
         """Thread to send queued notifications to the extension."""
         while self.running:
@@ -704,6 +1725,10 @@ class NativeMessagingHost:
         notification_thread = threading.Thread(target=self.notification_sender, daemon=True)
         notification_thread.start()
         
+        # Start heatmap precomputation thread
+        heatmap_thread = threading.Thread(target=self.heatmap_worker)
+        heatmap_thread.start()
+        
         while True:
             try:
                 message = self.get_message()
@@ -712,6 +1737,14 @@ class NativeMessagingHost:
                     
                 logging.debug(f'Received message: {message}')
                 
+                if message.get('action') in BACKGROUND_ACTIONS:
+                    self.submit_background(
+                        self.background_paths(message),
+                        self.handle_background_message,
+                        (message,)
+                    )
+                    continue
+                
                 response = self.handle_message(message)
                 response['response_to'] = message.get('id', 'unknown')
                 logging.debug(f'Sending response: {response}')
@@ -730,7 +1763,13 @@ class NativeMessagingHost:
                     pass
                 break
         
+        # Let queued moves and extractions finish before exiting
+        logging.info('Native messaging host finishing background work')
+        self.stop_background_workers()
+        
         self.running = False
+        # Let the heatmap worker save any unsaved cache entries
+        heatmap_thread.join()
         logging.info('Native messaging host shutting down')
 
 if __name__ == '__main__':
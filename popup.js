@@ -607,45 +607,35 @@ async function performRename(file, type, baseName) {
     }
     
     // Rename all files in the group
-    const renamePromises = allFilesToRename.map(groupFile => {
-      const extension = getFileExtension(groupFile.filename);
-      const newName = finalBaseName + extension;
-      
-      return browser.runtime.sendMessage({
-        action: 'renameFile',
-        fileId: groupFile.id,
-        type: currentRenameType,  // Use the correct type for each file
-        newName: newName,
-        originalName: groupFile.filename
-      });
-    });
+    const renames = allFilesToRename.map(groupFile => ({
+      fileId: groupFile.id,
+      type: currentRenameType,  // Use the correct type for each file
+      newName: finalBaseName + getFileExtension(groupFile.filename),
+      originalName: groupFile.filename
+    }));
     
     // Also rename the target file
-    const targetExtension = getFileExtension(file.filename);
-    const targetNewName = finalBaseName + targetExtension;
-    renamePromises.push(
-      browser.runtime.sendMessage({
-        action: 'renameFile',
-        fileId: file.id,
-        type: type,
-        newName: targetNewName,
-        originalName: file.filename
-      })
-    );
+    renames.push({
+      fileId: file.id,
+      type: type,
+      newName: finalBaseName + getFileExtension(file.filename),
+      originalName: file.filename
+    });
     
-    // Wait for all renames to complete
-    const results = await Promise.all(renamePromises);
-    const allSuccess = results.every(r => r.success);
+    // Rename the whole group at once so it is never left half-renamed
+    const result = await browser.runtime.sendMessage({
+      action: 'renameFiles',
+      renames: renames
+    });
     
-    if (allSuccess) {
+    if (result.success) {
       // Back out to normal view and reload files
       setTimeout(() => {
         cancelRenameMode();
         loadFiles();
       }, 1000);
     } else {
-      const errors = results.filter(r => !r.success).map(r => r.error || 'Unknown error');
-      alert(`Some files failed to rename:\n${errors.join('\n')}`);
+      alert(`Failed to rename files:\n${result.error || 'Unknown error'}`);
     }
   } else {
     // Single file rename (original behavior)
@@ -897,33 +887,25 @@ async function confirmGrouping() {
   
   const finalBaseName = editedGroupBaseName || getBaseNameForRename(currentGroupBase.filename);
   
-  // Rename all selected files to have the same base name
-  const renamePromises = selectedGroupFiles.map(file => {
-    const extension = getFileExtension(file.filename);
-    const newName = finalBaseName + extension;
-    
-    return browser.runtime.sendMessage({
-      action: 'renameFile',
+  // Rename all selected files to have the same base name, as one group
+  const result = await browser.runtime.sendMessage({
+    action: 'renameFiles',
+    renames: selectedGroupFiles.map(file => ({
       fileId: file.id,
       type: 'funscript',
-      newName: newName,
+      newName: finalBaseName + getFileExtension(file.filename),
       originalName: file.filename
-    });
+    }))
   });
   
-  // Wait for all renames to complete
-  const results = await Promise.all(renamePromises);
-  const allSuccess = results.every(r => r.success);
-  
-  if (allSuccess) {
+  if (result.success) {
     // Back out to normal view and reload files
     setTimeout(() => {
       cancelGroupMode();
       loadFiles();
     }, 1000);
   } else {
-    const errors = results.filter(r => !r.success).map(r => r.error || 'Unknown error');
-    alert(`Some files failed to rename:\n${errors.join('\n')}`);
+    alert(`Failed to rename files:\n${result.error || 'Unknown error'}`);
   }
 }
 